@@ -2,16 +2,23 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import io
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from fraud_detector import FraudDetector
-from data_processor import DataProcessor
+from data_processor import DataProcessor, INTERNAL_COLUMNS
 from visualizations import Visualizations
 from transaction_analyzer import TransactionAnalyzer
 from utils import Utils
 
+# Text/identifier columns read straight into Arrow-backed strings
+CSV_STRING_DTYPES = {
+    col: 'string[pyarrow]'
+    for col in ['transaction_id', 'merchant', 'location', 'user_id', 'card_type', 'merchant_category']
+}
+
 # Configure page
 st.set_page_config(
     page_title="Payment Fraud Detection System",
@@ -20,10 +27,62 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def frame_hash(df: pd.DataFrame) -> int:
+    # Content hash used to key cached results on DataFrames
+    return int(pd.util.hash_pandas_object(df).sum())
+
+@st.cache_data(show_spinner=False)
+def _cached_detect_fraud(df_hash: int, detector_settings: tuple, _df: pd.DataFrame) -> pd.DataFrame:
+    # Keyed on the frame's content hash and the detector settings; the frame
+    # itself is excluded from Streamlit's hashing via the leading underscore.
+    return st.session_state.fraud_detector.detect_fraud(_df)
+
+@st.cache_data(show_spinner=False)
+def load_and_process(file_bytes: bytes) -> pd.DataFrame:
+    # Streamlit hashes the raw upload bytes, so reruns skip parsing entirely
+    df = pd.read_csv(io.BytesIO(file_bytes), engine='pyarrow', dtype=CSV_STRING_DTYPES)
+    df = DataProcessor().process_transactions(df)
+    # Keep rows in time order so date ranges can be sliced by binary search
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+def detect_fraud_cached(transactions: pd.DataFrame) -> pd.DataFrame:
+    detector_settings = tuple(sorted(st.session_state.fraud_detector.settings.items()))
+    return _cached_detect_fraud(frame_hash(transactions), detector_settings, transactions)
+
+@st.cache_data(show_spinner=False)
+def _cached_csv_export(df_hash: int, _df: pd.DataFrame) -> bytes:
+    # Internal lookup keys stay out of the downloaded file
+    return _df.drop(columns=INTERNAL_COLUMNS, errors='ignore').to_csv(index=False).encode()
+
+@st.cache_data(show_spinner=False)
+def _cached_summary_report(df_hash: int, _df: pd.DataFrame) -> str:
+    return Utils.generate_summary_report(_df)
+
+def build_transaction_index(transactions: pd.DataFrame) -> dict:
+    # transaction_id -> row position; keyed as str to match the lookup text box
+    return dict(zip(transactions['transaction_id'].astype(str), range(len(transactions))))
+
+def build_user_index(transactions: pd.DataFrame) -> dict:
+    # user_id -> row positions ordered newest first
+    order = transactions['timestamp'].to_numpy().argsort(kind='stable')[::-1]
+    user_ids = transactions['user_id'].to_numpy()[order]
+    groups = pd.Series(order).groupby(user_ids, sort=False).indices
+    return {user_id: order[positions] for user_id, positions in groups.items()}
+
 def main():
     # Initialize session state
     if 'transactions' not in st.session_state:
         st.session_state.transactions = None
+    if 'scored_transactions' not in st.session_state:
+        st.session_state.scored_transactions = None
+    if 'tx_index' not in st.session_state:
+        st.session_state.tx_index = None
+    if 'user_index' not in st.session_state:
+        st.session_state.user_index = None
+    if 'loaded_file_id' not in st.session_state:
+        st.session_state.loaded_file_id = None
+    if 'show_queue' not in st.session_state:
+        st.session_state.show_queue = False
     if 'fraud_detector' not in st.session_state:
         st.session_state.fraud_detector = FraudDetector()
     if 'data_processor' not in st.session_state:
@@ -55,9 +114,14 @@ def main():
     # Process uploaded data
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
-            st.session_state.transactions = st.session_state.data_processor.process_transactions(df)
-            st.sidebar.success(f"✅ Loaded {len(df)} transactions")
+            # Only a newly uploaded file needs loading, scoring and indexing
+            if uploaded_file.file_id != st.session_state.loaded_file_id:
+                st.session_state.transactions = load_and_process(uploaded_file.getvalue())
+                st.session_state.scored_transactions = detect_fraud_cached(st.session_state.transactions)
+                st.session_state.tx_index = build_transaction_index(st.session_state.transactions)
+                st.session_state.user_index = build_user_index(st.session_state.transactions)
+                st.session_state.loaded_file_id = uploaded_file.file_id
+            st.sidebar.success(f"✅ Loaded {len(st.session_state.transactions)} transactions")
         except Exception as e:
             st.sidebar.error(f"❌ Error loading data: {str(e)}")
 
@@ -78,6 +142,14 @@ def main():
         """)
         return
 
+    # Score once and share the result across pages
+    if st.session_state.scored_transactions is None:
+        st.session_state.scored_transactions = detect_fraud_cached(st.session_state.transactions)
+    if st.session_state.tx_index is None:
+        st.session_state.tx_index = build_transaction_index(st.session_state.transactions)
+    if st.session_state.user_index is None:
+        st.session_state.user_index = build_user_index(st.session_state.transactions)
+
     # Route to selected page
     if page == "Dashboard":
         show_dashboard()
@@ -93,19 +165,15 @@ def main():
 def show_dashboard():
     st.header("📊 Fraud Detection Dashboard")
     
-    transactions = st.session_state.transactions
-    fraud_detector = st.session_state.fraud_detector
+    transactions_with_scores = st.session_state.scored_transactions
     visualizations = st.session_state.visualizations
     
-    # Run fraud detection
-    transactions_with_scores = fraud_detector.detect_fraud(transactions)
-    
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
     total_transactions = len(transactions_with_scores)
-    flagged_transactions = len(transactions_with_scores[transactions_with_scores['is_fraud'] == True])
-    high_risk_transactions = len(transactions_with_scores[transactions_with_scores['risk_score'] > 0.7])
+    flagged_transactions = int(transactions_with_scores['is_fraud'].sum())
+    high_risk_transactions = int((transactions_with_scores['risk_score'] > 0.7).sum())
     total_amount = transactions_with_scores['amount'].sum()
     
     with col1:
@@ -117,20 +185,20 @@ def show_dashboard():
     with col4:
         st.metric("Total Amount", f"${total_amount:,.2f}")
     
-    # Risk distribution
-    st.subheader("Risk Score Distribution")
-    fig_risk = visualizations.create_risk_distribution(transactions_with_scores)
-    st.plotly_chart(fig_risk, use_container_width=True)
+    # Tabs only change the client-side layout: every tab body (and its figure) still runs on each rerun
+    tab_risk, tab_time, tab_location = st.tabs(["Risk", "Time", "Location"])
     
-    # Time series analysis
-    col1, col2 = st.columns(2)
+    with tab_risk:
+        st.subheader("Risk Score Distribution")
+        fig_risk = visualizations.create_risk_distribution(transactions_with_scores)
+        st.plotly_chart(fig_risk, use_container_width=True)
     
-    with col1:
+    with tab_time:
         st.subheader("Transactions Over Time")
         fig_time = visualizations.create_time_series(transactions_with_scores)
         st.plotly_chart(fig_time, use_container_width=True)
     
-    with col2:
+    with tab_location:
         st.subheader("Fraud by Location")
         fig_location = visualizations.create_location_analysis(transactions_with_scores)
         st.plotly_chart(fig_location, use_container_width=True)
@@ -139,21 +207,27 @@ def show_dashboard():
     st.subheader("⚠️ Recent High-Risk Transactions")
     high_risk = transactions_with_scores[
         transactions_with_scores['risk_score'] > 0.6
-    ].sort_values('timestamp', ascending=False).head(10)
+    ].nlargest(10, 'timestamp')
     
     if not high_risk.empty:
-        st.dataframe(
-            high_risk[['transaction_id', 'amount', 'merchant', 'location', 'risk_score', 'fraud_reasons']],
-            use_container_width=True
-        )
+        # Static table: the panel is at most 10 rows, no interactive grid needed
+        st.table(high_risk[['transaction_id', 'amount', 'merchant', 'location', 'risk_score', 'fraud_reasons']])
     else:
         st.info("No high-risk transactions detected recently.")
 
 def show_transaction_analysis():
     st.header("🔍 Transaction Analysis")
     
-    transactions = st.session_state.transactions
-    visualizations = st.session_state.visualizations
+    _analysis_fragment(st.session_state.scored_transactions, st.session_state.visualizations)
+
+# Filter changes rerun only this fragment instead of the whole script
+@st.fragment
+def _analysis_fragment(transactions, visualizations):
+    # Column bounds used by the filter widgets
+    amt_min = float(transactions['amount'].min())
+    amt_max = float(transactions['amount'].max())
+    ts_min = transactions['timestamp'].min()
+    ts_max = transactions['timestamp'].max()
     
     # Filters
     st.subheader("Filters")
@@ -162,34 +236,37 @@ def show_transaction_analysis():
     with col1:
         amount_range = st.slider(
             "Amount Range",
-            min_value=float(transactions['amount'].min()),
-            max_value=float(transactions['amount'].max()),
-            value=(float(transactions['amount'].min()), float(transactions['amount'].max()))
+            min_value=amt_min,
+            max_value=amt_max,
+            value=(amt_min, amt_max)
         )
     
     with col2:
+        # location is categorical after loading, so its categories are already stored
+        location_options = transactions['location'].cat.categories
         locations = st.multiselect(
             "Locations",
-            options=transactions['location'].unique(),
-            default=list(transactions['location'].unique())[:5]
+            options=location_options,
+            default=list(location_options[:5])
         )
     
     with col3:
         date_range = st.date_input(
             "Date Range",
-            value=(transactions['timestamp'].min().date(), transactions['timestamp'].max().date()),
-            min_value=transactions['timestamp'].min().date(),
-            max_value=transactions['timestamp'].max().date()
+            value=(ts_min.date(), ts_max.date()),
+            min_value=ts_min.date(),
+            max_value=ts_max.date()
         )
     
-    # Apply filters
-    filtered_transactions = transactions[
-        (transactions['amount'] >= amount_range[0]) &
-        (transactions['amount'] <= amount_range[1]) &
-        (transactions['location'].isin(locations)) &
-        (transactions['timestamp'].dt.date >= date_range[0]) &
-        (transactions['timestamp'].dt.date <= date_range[1])
-    ]
+    # Apply filters in a single fused expression; dates are compared as
+    # epoch-day integers against the precomputed _date_ord column
+    min_amount, max_amount = amount_range
+    start_ord = np.datetime64(date_range[0], 'D').astype('int64')
+    end_ord = np.datetime64(date_range[1], 'D').astype('int64')
+    filtered_transactions = transactions.query(
+        "amount >= @min_amount and amount <= @max_amount and location in @locations "
+        "and _date_ord >= @start_ord and _date_ord <= @end_ord"
+    )
     
     st.write(f"Showing {len(filtered_transactions)} transactions")
     
@@ -215,7 +292,6 @@ def show_manual_review():
     st.header("👤 Manual Transaction Review")
     
     transactions = st.session_state.transactions
-    fraud_detector = st.session_state.fraud_detector
     transaction_analyzer = st.session_state.transaction_analyzer
     
     # Transaction lookup
@@ -223,10 +299,10 @@ def show_manual_review():
     transaction_id = st.text_input("Enter Transaction ID for review:")
     
     if transaction_id:
-        transaction = transactions[transactions['transaction_id'] == transaction_id]
+        row = st.session_state.tx_index.get(transaction_id)
         
-        if not transaction.empty:
-            tx = transaction.iloc[0]
+        if row is not None:
+            tx = transactions.iloc[row]
             
             # Display transaction details
             st.subheader("Transaction Details")
@@ -245,7 +321,7 @@ def show_manual_review():
             with col3:
                 st.write(f"**Merchant Category:** {tx['merchant_category']}")
             
-            # Calculate risk score
+            # Calculate risk score (the analyzer reuses its cached context across reruns)
             risk_analysis = transaction_analyzer.analyze_single_transaction(tx, transactions)
             
             # Display risk analysis
@@ -283,11 +359,12 @@ def show_manual_review():
             
             # Historical patterns for this user
             st.subheader("User Transaction History")
-            user_history = transactions[transactions['user_id'] == tx['user_id']].sort_values('timestamp', ascending=False)
+            user_rows = st.session_state.user_index.get(tx['user_id'], np.empty(0, dtype=int))
+            user_history = transactions.iloc[user_rows[:10]]
             
-            if len(user_history) > 1:
+            if len(user_rows) > 1:
                 st.dataframe(
-                    user_history[['transaction_id', 'amount', 'merchant', 'location', 'timestamp']].head(10),
+                    user_history[['transaction_id', 'amount', 'merchant', 'location', 'timestamp']],
                     use_container_width=True
                 )
             else:
@@ -298,44 +375,38 @@ def show_manual_review():
     
     # Bulk review section
     st.markdown("---")
-    st.subheader("Bulk Review Queue")
-    
-    # Get flagged transactions
-    flagged_transactions = fraud_detector.detect_fraud(transactions)
-    high_risk_queue = flagged_transactions[
-        flagged_transactions['risk_score'] > 0.6
-    ].sort_values('risk_score', ascending=False).head(20)
-    
-    if not high_risk_queue.empty:
-        st.write(f"**{len(high_risk_queue)} transactions requiring review**")
+    with st.expander("Bulk Review Queue", expanded=st.session_state.show_queue):
+        # Expander bodies run even when collapsed, so the queue is only built once requested
+        if not st.session_state.show_queue and st.button("Load review queue"):
+            st.session_state.show_queue = True
         
-        for idx, (_, tx) in enumerate(high_risk_queue.iterrows()):
-            with st.expander(f"Transaction {tx['transaction_id']} - Risk: {tx['risk_score']:.2%}"):
-                col1, col2, col3, col4 = st.columns(4)
+        if st.session_state.show_queue:
+            # Get flagged transactions
+            flagged_transactions = st.session_state.scored_transactions
+            high_risk_queue = flagged_transactions[
+                flagged_transactions['risk_score'] > 0.6
+            ].nlargest(20, 'risk_score')
+            
+            if not high_risk_queue.empty:
+                st.write(f"**{len(high_risk_queue)} transactions requiring review**")
                 
-                with col1:
-                    st.write(f"Amount: ${tx['amount']:,.2f}")
-                    st.write(f"Location: {tx['location']}")
+                display_df = high_risk_queue[
+                    ['transaction_id', 'amount', 'merchant', 'location', 'timestamp', 'risk_score', 'fraud_reasons']
+                ]
+                st.dataframe(display_df, use_container_width=True)
                 
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    selected_id = st.selectbox("Review transaction", display_df['transaction_id'])
                 with col2:
-                    st.write(f"Merchant: {tx['merchant']}")
-                    st.write(f"Time: {tx['timestamp']}")
-                
-                with col3:
-                    st.write(f"Risk Factors:")
-                    if pd.notna(tx['fraud_reasons']):
-                        for reason in tx['fraud_reasons'].split(', '):
-                            st.write(f"• {reason}")
-                
-                with col4:
-                    st.button(f"Review {tx['transaction_id']}", key=f"review_{idx}")
-    else:
-        st.info("No transactions currently in review queue.")
+                    st.button(f"Review {selected_id}", key="review_selected")
+            else:
+                st.info("No transactions currently in review queue.")
 
 def show_historical_data():
     st.header("📈 Historical Data Analysis")
     
-    transactions = st.session_state.transactions
+    transactions = st.session_state.scored_transactions
     visualizations = st.session_state.visualizations
     
     # Time period selector
@@ -355,10 +426,11 @@ def show_historical_data():
     else:
         start_date = transactions['timestamp'].min()
     
-    filtered_data = transactions[
-        (transactions['timestamp'] >= start_date) &
-        (transactions['timestamp'] <= end_date)
-    ]
+    # Rows are time-ordered at load, so the period is a contiguous slice
+    timestamps = transactions['timestamp']
+    lo = timestamps.searchsorted(start_date, side='left')
+    hi = timestamps.searchsorted(end_date, side='right')
+    filtered_data = transactions.iloc[lo:hi]
     
     # Summary statistics
     st.subheader("Summary Statistics")
@@ -397,7 +469,7 @@ def show_historical_data():
     
     with col1:
         if st.button("📊 Export to CSV"):
-            csv = filtered_data.to_csv(index=False)
+            csv = _cached_csv_export(frame_hash(filtered_data), filtered_data)
             st.download_button(
                 label="Download CSV",
                 data=csv,
@@ -407,7 +479,7 @@ def show_historical_data():
     
     with col2:
         if st.button("📈 Export Summary Report"):
-            summary_report = Utils.generate_summary_report(filtered_data)
+            summary_report = _cached_summary_report(frame_hash(filtered_data), filtered_data)
             st.download_button(
                 label="Download Report",
                 data=summary_report,
@@ -418,6 +490,21 @@ def show_historical_data():
 def show_settings():
     st.header("⚙️ Settings")
     
+    _settings_fragment()
+    
+    # System information
+    st.markdown("---")
+    st.subheader("System Information")
+    st.write(f"**Application Version:** 1.0.0")
+    st.write(f"**Last Data Update:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    if st.session_state.transactions is not None:
+        st.write(f"**Total Transactions Loaded:** {len(st.session_state.transactions):,}")
+        st.write(f"**Data Date Range:** {st.session_state.transactions['timestamp'].min()} to {st.session_state.transactions['timestamp'].max()}")
+
+# Parameter widgets rerun only this fragment instead of the whole script
+@st.fragment
+def _settings_fragment():
     st.subheader("Fraud Detection Parameters")
     
     col1, col2 = st.columns(2)
@@ -454,17 +541,9 @@ def show_settings():
         }
         
         st.session_state.fraud_detector.update_settings(settings)
+        if st.session_state.transactions is not None:
+            st.session_state.scored_transactions = detect_fraud_cached(st.session_state.transactions)
         st.success("✅ Settings saved successfully!")
-    
-    # System information
-    st.markdown("---")
-    st.subheader("System Information")
-    st.write(f"**Application Version:** 1.0.0")
-    st.write(f"**Last Data Update:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    if st.session_state.transactions is not None:
-        st.write(f"**Total Transactions Loaded:** {len(st.session_state.transactions):,}")
-        st.write(f"**Data Date Range:** {st.session_state.transactions['timestamp'].min()} to {st.session_state.transactions['timestamp'].max()}")
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,22 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 import re
 
+from utils import Utils
+
+# Copy-on-write lets the pipeline share the caller's data instead of deep-copying it
+pd.set_option('mode.copy_on_write', True)
+
+# Cleanup patterns, compiled once at import
+CURRENCY_SYMBOLS = re.compile(r'[$,€£¥]')
+MERCHANT_SPECIAL_CHARS = re.compile(r'[^\w\s-]')
+LOCATION_WHITESPACE = re.compile(r'\s+')
+# Plain ASCII pattern string, so .str.replace stays on the Arrow kernel
+LOCATION_SEPARATORS = r'[,;]'
+ISO_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+
+# Internal lookup keys added by _add_derived_features; dropped before anything user-facing
+INTERNAL_COLUMNS = ['_date_ord', '_hour']
+
 class DataProcessor:
     def __init__(self):
         self.required_columns = [
@@ -15,8 +31,8 @@ class DataProcessor:
         """
         Process raw transaction data and prepare it for fraud detection
         """
-        # Create a copy to avoid modifying original data
-        processed_df = df.copy()
+        # Shallow copy: under copy-on-write the original data is never modified
+        processed_df = df.copy(deep=False)
         
         # Validate required columns
         processed_df = self._validate_columns(processed_df)
@@ -39,6 +55,9 @@ class DataProcessor:
         # Remove invalid records
         processed_df = self._remove_invalid_records(processed_df)
         
+        # Narrow numeric dtypes
+        processed_df = self._downcast_numeric_columns(processed_df)
+        
         return processed_df
     
     def _validate_columns(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -119,33 +138,31 @@ class DataProcessor:
         """Process and validate timestamps"""
         # Convert timestamp to datetime
         if df['timestamp'].dtype == 'object':
-            # Try different datetime formats
-            formats_to_try = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M:%S.%f',
-                '%Y-%m-%d',
-                '%m/%d/%Y %H:%M:%S',
-                '%m/%d/%Y',
-                '%d/%m/%Y %H:%M:%S',
-                '%d/%m/%Y'
-            ]
+            timestamps = df['timestamp']
+            parsed = None
             
-            timestamp_converted = False
-            for fmt in formats_to_try:
-                try:
-                    df['timestamp'] = pd.to_datetime(df['timestamp'], format=fmt)
-                    timestamp_converted = True
-                    break
-                except (ValueError, TypeError):
-                    continue
+            # Fast path: a fixed ISO layout parses with the exact C parser
+            first_valid = timestamps.first_valid_index()
+            if first_valid is not None and ISO_TIMESTAMP.fullmatch(str(timestamps[first_valid])):
+                parsed = pd.to_datetime(timestamps, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+                if parsed.isna().mean() > 0.01:
+                    parsed = None
             
-            if not timestamp_converted:
-                try:
-                    df['timestamp'] = pd.to_datetime(df['timestamp'])
-                except:
-                    # If all fails, use current time with incremental seconds
-                    base_time = datetime.now()
-                    df['timestamp'] = [base_time + timedelta(seconds=i) for i in range(len(df))]
+            # Otherwise infer the format per value in a single pass
+            if parsed is None:
+                parsed = pd.to_datetime(timestamps, format='mixed', errors='coerce')
+            
+            if parsed.notna().any():
+                # Unparseable values stay NaT and are dropped as invalid records
+                df['timestamp'] = parsed
+            else:
+                # If all fails, use current time with incremental seconds
+                base_time = datetime.now()
+                df['timestamp'] = [base_time + timedelta(seconds=i) for i in range(len(df))]
+        
+        # Normalize resolution (the PyArrow CSV reader yields datetime64[s])
+        if df['timestamp'].dtype != 'datetime64[ns]':
+            df['timestamp'] = df['timestamp'].astype('datetime64[ns]')
         
         # Ensure timestamps are in the past
         future_timestamps = df['timestamp'] > datetime.now()
@@ -160,7 +177,7 @@ class DataProcessor:
         # Convert amount to numeric
         if df['amount'].dtype == 'object':
             # Remove currency symbols and commas
-            df['amount'] = df['amount'].astype(str).str.replace(r'[$,€£¥]', '', regex=True)
+            df['amount'] = df['amount'].astype(str).str.replace(CURRENCY_SYMBOLS, '', regex=True)
             df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
         
         # Handle negative amounts (make them positive)
@@ -181,21 +198,23 @@ class DataProcessor:
         
         for col in text_columns:
             if col in df.columns:
-                # Strip whitespace and convert to title case
-                df[col] = df[col].astype(str).str.strip().str.title()
+                # Strip whitespace and convert to title case on Arrow-backed strings
+                values = df[col].astype('string[pyarrow]').str.strip().str.title()
                 
-                # Replace empty strings with 'Unknown'
-                df.loc[df[col].isin(['', 'Nan', 'None', 'Null']), col] = 'Unknown'
+                # Replace missing and empty strings with 'Unknown'
+                values = values.mask(values.isna() | values.isin(['', 'Nan', 'None', 'Null']), 'Unknown')
                 
                 # Clean special characters from merchant names
                 if col == 'merchant':
-                    df[col] = df[col].str.replace(r'[^\w\s-]', '', regex=True)
+                    # Compiled pattern keeps \w Unicode-aware; the non-Arrow fallback is intentional
+                    values = values.str.replace(MERCHANT_SPECIAL_CHARS, '', regex=True)
                 
                 # Standardize location format
                 if col == 'location':
                     # Simple cleaning - remove extra spaces and standardize separators
-                    df[col] = df[col].str.replace(r'\s+', ' ', regex=True)
-                    df[col] = df[col].str.replace(r'[,;]', ',', regex=True)
+                    # Compiled pattern keeps \s Unicode-aware; the non-Arrow fallback is intentional
+                    values = values.str.replace(LOCATION_WHITESPACE, ' ', regex=True)
+                    values = values.str.replace(LOCATION_SEPARATORS, ',', regex=True)
                 
                 # Standardize card types
                 if col == 'card_type':
@@ -210,29 +229,44 @@ class DataProcessor:
                         'credit': 'Credit'
                     }
                     
-                    df[col] = df[col].str.lower()
-                    for old_val, new_val in card_type_mapping.items():
-                        df.loc[df[col].str.contains(old_val, na=False), col] = new_val
+                    # Resolve each distinct value once: the first contained key wins
+                    values = values.str.lower()
+                    standardized = {
+                        value: next((new_val for old_val, new_val in card_type_mapping.items() if old_val in value), value)
+                        for value in values.unique()
+                    }
+                    values = values.map(standardized)
+                
+                # Low-cardinality text is stored as categorical for downstream scans
+                df[col] = values.astype('category')
         
         return df
     
     def _add_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add derived features that might be useful for fraud detection"""
-        # Add time-based features
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
-        df['month'] = df['timestamp'].dt.month
-        df['is_weekend'] = df['day_of_week'].isin([5, 6])
-        
-        # Add amount-based features
-        df['amount_rounded'] = (df['amount'] % 1 == 0)  # Check if amount is rounded
-        df['amount_log'] = np.log1p(df['amount'])  # Log transform for amount
-        
-        # Add merchant features
-        df['merchant_length'] = df['merchant'].str.len()
-        df['merchant_word_count'] = df['merchant'].str.split().str.len()
-        
-        return df
+        # Read the source columns once and add every feature in a single assign;
+        # small integer features use the narrowest signed dtype that fits
+        timestamps = pd.DatetimeIndex(df['timestamp'])
+        day_of_week = timestamps.dayofweek.to_numpy().astype('int8')
+        amount = df['amount'].to_numpy()
+        hour = timestamps.hour.to_numpy().astype('int8')
+        
+        return df.assign(
+            # Time-based features
+            hour=hour,
+            day_of_week=day_of_week,
+            month=timestamps.month.to_numpy().astype('int8'),
+            is_weekend=day_of_week >= 5,
+            # Amount-based features
+            amount_rounded=np.mod(amount, 1) == 0,  # Check if amount is rounded
+            amount_log=np.log1p(amount),  # Log transform for amount
+            # Merchant features (word count without building token lists)
+            merchant_length=df['merchant'].str.len().astype('int16'),
+            merchant_word_count=df['merchant'].str.count(r'\S+').astype('int16'),
+            # Compact day/hour keys reused by page filters and hourly charts (see INTERNAL_COLUMNS)
+            _date_ord=timestamps.to_numpy().astype('datetime64[D]').view('int64'),
+            _hour=hour
+        )
     
     def _remove_invalid_records(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove records that are clearly invalid"""
@@ -256,6 +290,16 @@ class DataProcessor:
         
         return df
     
+    def _downcast_numeric_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast numeric columns to the narrowest dtype that still holds their values"""
+        # amount stays float64: float32 cannot hold cent values exactly and money totals would drift
+        
+        # Only ids that are already integers; string ids keep leading zeros etc.
+        if pd.api.types.is_integer_dtype(df['user_id']):
+            df['user_id'] = pd.to_numeric(df['user_id'], downcast='integer')
+        
+        return df
+    
     def validate_data_quality(self, df: pd.DataFrame) -> Dict:
         """Validate data quality and return quality metrics"""
         quality_metrics = {
@@ -266,29 +310,26 @@ class DataProcessor:
             'potential_issues': []
         }
         
-        # Check for missing values
-        for col in df.columns:
-            missing_count = df[col].isna().sum()
-            quality_metrics['missing_values'][col] = missing_count
-            
-            if missing_count > 0:
-                quality_metrics['potential_issues'].append(f"{col}: {missing_count} missing values")
+        # Check for missing values (one reduction over all columns)
+        missing_counts = df.isna().sum()
+        quality_metrics['missing_values'] = missing_counts.to_dict()
+        for col, missing_count in missing_counts[missing_counts > 0].items():
+            quality_metrics['potential_issues'].append(f"{col}: {missing_count} missing values")
         
         # Check data types
-        for col in df.columns:
-            quality_metrics['data_types'][col] = str(df[col].dtype)
+        quality_metrics['data_types'] = df.dtypes.astype(str).to_dict()
         
         # Check unique values for categorical columns
         categorical_columns = ['merchant', 'location', 'card_type', 'merchant_category']
-        for col in categorical_columns:
-            if col in df.columns:
-                quality_metrics['unique_values'][col] = df[col].nunique()
+        present_columns = [col for col in categorical_columns if col in df.columns]
+        quality_metrics['unique_values'] = df[present_columns].nunique().to_dict()
         
         # Check for potential data issues
-        if df['amount'].min() < 0:
+        amount_stats = df['amount'].agg(['min', 'max'])
+        if amount_stats['min'] < 0:
             quality_metrics['potential_issues'].append("Negative amounts detected")
         
-        if df['amount'].max() > 100000:
+        if amount_stats['max'] > 100000:
             quality_metrics['potential_issues'].append("Very large amounts detected")
         
         # Check timestamp range
@@ -309,7 +350,6 @@ class DataProcessor:
             'user_id', 'card_type', 'merchant_category'
         ]
         
-        export_df = df[export_columns].copy()
-        csv_data = export_df.to_csv(index=False)
+        csv_data = Utils.frame_to_csv(df[export_columns])
         
         return csv_data
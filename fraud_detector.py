@@ -2,9 +2,39 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
+import re
 import warnings
 warnings.filterwarnings('ignore')
 
+# Copy-on-write lets detection share the caller's data instead of deep-copying it
+pd.set_option('mode.copy_on_write', True)
+
+# Rule reasons in the order they are reported; each maps to one bit of reason_bits
+FRAUD_REASONS = [
+    'Extreme amount',
+    'Large amount',
+    'Micro transaction',
+    'Round amount',
+    'Off-hours transaction',
+    'Weekend transaction',
+    'Rapid consecutive transactions',
+    'High hourly velocity',
+    'High daily amount',
+    'Rapid location change',
+    'High-risk location',
+    'New/rare merchant',
+    'High-risk category (gambling)',
+    'High-risk category (adult)',
+    'High-risk category (cryptocurrency)',
+    'High-risk category (cash_advance)',
+    'Suspicious merchant name'
+]
+REASON_BITS = {reason: np.uint32(1 << bit) for bit, reason in enumerate(FRAUD_REASONS)}
+
+# Case-insensitive keyword scans, compiled once so columns need no lowercased copy
+HIGH_RISK_LOCATION_NAMES = re.compile(r'unknown|test|temp|null', re.IGNORECASE)
+SUSPICIOUS_MERCHANT_NAMES = re.compile(r'test|temp|fake|dummy', re.IGNORECASE)
+
 class FraudDetector:
     def __init__(self):
         self.settings = {
@@ -27,183 +57,178 @@ class FraudDetector:
         Main fraud detection function that applies multiple rules and returns
         transactions with fraud scores and flags
         """
-        df = transactions.copy()
+        # Shallow copy: under copy-on-write the original data is never modified
+        df = transactions.copy(deep=False)
         
         # Initialize fraud detection columns
         df['risk_score'] = 0.0
         df['is_fraud'] = False
-        df['fraud_reasons'] = ''
+        df['reason_bits'] = np.uint32(0)
         
         # Apply various fraud detection rules
         df = self._check_amount_anomalies(df)
         df = self._check_time_patterns(df)
-        df = self._check_velocity_patterns(df)
-        df = self._check_location_patterns(df)
+        user_history = self._sort_user_history(df)
+        df = self._check_velocity_patterns(df, user_history)
+        df = self._check_location_patterns(df, user_history)
         df = self._check_merchant_patterns(df)
         df = self._calculate_final_score(df)
         
         return df
     
+    def _apply_rule(self, df: pd.DataFrame, rows, score: float, reason: str):
+        """Add a rule's score and reason to the matching rows"""
+        # rows is a boolean mask or an array of row positions
+        hit = np.zeros(len(df), dtype=bool)
+        hit[rows] = True
+        df['risk_score'] = df['risk_score'].to_numpy() + np.where(hit, score, 0.0)
+        df['reason_bits'] = df['reason_bits'].to_numpy() | np.where(hit, REASON_BITS[reason], np.uint32(0))
+    
     def _check_amount_anomalies(self, df: pd.DataFrame) -> pd.DataFrame:
         """Check for unusual transaction amounts"""
+        # All amount rules share one ndarray view of the column
+        amount = df['amount'].to_numpy()
+        
         # Statistical outliers
         amount_mean = df['amount'].mean()
         amount_std = df['amount'].std()
         z_threshold = 3
         
-        # Flag transactions with extreme amounts
-        extreme_amounts = np.abs((df['amount'] - amount_mean) / amount_std) > z_threshold
-        df.loc[extreme_amounts, 'risk_score'] += 0.3
-        df.loc[extreme_amounts, 'fraud_reasons'] += 'Extreme amount, '
+        # Flag transactions with extreme amounts (|z| > threshold, without dividing)
+        extreme_amounts = np.abs(amount - amount_mean) > z_threshold * amount_std
+        self._apply_rule(df, extreme_amounts, 0.3, 'Extreme amount')
         
         # Flag very large transactions
-        large_amounts = df['amount'] > self.settings['unusual_amount_threshold']
-        df.loc[large_amounts, 'risk_score'] += 0.2
-        df.loc[large_amounts, 'fraud_reasons'] += 'Large amount, '
+        large_amounts = amount > self.settings['unusual_amount_threshold']
+        self._apply_rule(df, large_amounts, 0.2, 'Large amount')
         
         # Flag micro transactions (potential testing)
-        micro_amounts = df['amount'] < self.settings['micro_transaction_threshold']
-        df.loc[micro_amounts, 'risk_score'] += 0.1
-        df.loc[micro_amounts, 'fraud_reasons'] += 'Micro transaction, '
+        micro_amounts = amount < self.settings['micro_transaction_threshold']
+        self._apply_rule(df, micro_amounts, 0.1, 'Micro transaction')
         
         # Flag round amounts (potential fraud indicator)
-        round_amounts = (df['amount'] % 100 == 0) & (df['amount'] > 100)
-        df.loc[round_amounts, 'risk_score'] += 0.05
-        df.loc[round_amounts, 'fraud_reasons'] += 'Round amount, '
+        round_amounts = (np.mod(amount, 100) == 0) & (amount > 100)
+        self._apply_rule(df, round_amounts, 0.05, 'Round amount')
         
         return df
     
     def _check_time_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Check for suspicious time patterns"""
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
+        # Evaluate rules on plain arrays, reusing the hour key precomputed at load
+        if '_hour' in df.columns:
+            hour = df['_hour'].to_numpy()
+        else:
+            hour = df['timestamp'].dt.hour.to_numpy()
+        day_of_week = df['timestamp'].dt.dayofweek.to_numpy()
         
         # Off-hours transactions
         off_hours_start = self.settings['off_hours_start'].hour
         off_hours_end = self.settings['off_hours_end'].hour
         
         if off_hours_start > off_hours_end:  # Spans midnight
-            off_hours = (df['hour'] >= off_hours_start) | (df['hour'] <= off_hours_end)
+            off_hours = (hour >= off_hours_start) | (hour <= off_hours_end)
         else:
-            off_hours = (df['hour'] >= off_hours_start) & (df['hour'] <= off_hours_end)
+            off_hours = (hour >= off_hours_start) & (hour <= off_hours_end)
         
-        df.loc[off_hours, 'risk_score'] += 0.15
-        df.loc[off_hours, 'fraud_reasons'] += 'Off-hours transaction, '
+        self._apply_rule(df, off_hours, 0.15, 'Off-hours transaction')
         
         # Weekend transactions (higher risk for certain merchant types)
-        weekend_transactions = df['day_of_week'].isin([5, 6])  # Saturday, Sunday
-        df.loc[weekend_transactions, 'risk_score'] += 0.05
-        df.loc[weekend_transactions, 'fraud_reasons'] += 'Weekend transaction, '
+        weekend_transactions = day_of_week >= 5  # Saturday, Sunday
+        self._apply_rule(df, weekend_transactions, 0.05, 'Weekend transaction')
         
         return df
     
-    def _check_velocity_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _sort_user_history(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Order the columns used by per-user rules by user and time"""
+        # Only the needed columns are permuted; the reset index keeps each row's original position
+        columns = ['user_id', 'timestamp', 'amount', 'location']
+        return df[columns].reset_index(drop=True).sort_values(['user_id', 'timestamp'], kind='stable')
+    
+    def _check_velocity_patterns(self, df: pd.DataFrame, df_sorted: pd.DataFrame = None) -> pd.DataFrame:
         """Check for transaction velocity anomalies"""
-        df_sorted = df.sort_values('timestamp')
-        
-        # Check for rapid-fire transactions from same user
-        for user_id in df['user_id'].unique():
-            user_transactions = df_sorted[df_sorted['user_id'] == user_id].copy()
-            
-            if len(user_transactions) > 1:
-                # Time differences between consecutive transactions
-                user_transactions['time_diff'] = user_transactions['timestamp'].diff()
-                
-                # Flag transactions within 1 minute of each other
-                rapid_transactions = user_transactions['time_diff'] < timedelta(minutes=1)
-                rapid_indices = user_transactions[rapid_transactions].index
-                
-                df.loc[rapid_indices, 'risk_score'] += 0.25
-                df.loc[rapid_indices, 'fraud_reasons'] += 'Rapid consecutive transactions, '
-                
-                # Check hourly transaction count
-                user_transactions['hour_group'] = user_transactions['timestamp'].dt.floor('H')
-                hourly_counts = user_transactions.groupby('hour_group').size()
-                excessive_hourly = hourly_counts > self.settings['max_transactions_per_hour']
-                
-                if excessive_hourly.any():
-                    excessive_hours = hourly_counts[excessive_hourly].index
-                    for hour in excessive_hours:
-                        hour_transactions = user_transactions[
-                            user_transactions['hour_group'] == hour
-                        ].index
-                        df.loc[hour_transactions, 'risk_score'] += 0.2
-                        df.loc[hour_transactions, 'fraud_reasons'] += 'High hourly velocity, '
-                
-                # Check daily amount limits
-                user_transactions['date'] = user_transactions['timestamp'].dt.date
-                daily_amounts = user_transactions.groupby('date')['amount'].sum()
-                excessive_daily = daily_amounts > self.settings['max_amount_per_day']
-                
-                if excessive_daily.any():
-                    excessive_dates = daily_amounts[excessive_daily].index
-                    for date in excessive_dates:
-                        date_transactions = user_transactions[
-                            user_transactions['date'] == date
-                        ].index
-                        df.loc[date_transactions, 'risk_score'] += 0.15
-                        df.loc[date_transactions, 'fraud_reasons'] += 'High daily amount, '
+        # Evaluate all users together over their time-ordered transactions
+        if df_sorted is None:
+            df_sorted = self._sort_user_history(df)
+        user_groups = df_sorted.groupby('user_id')
+        multi_transaction_users = user_groups['timestamp'].transform('size') > 1
+        
+        # Flag transactions within 1 minute of the user's previous one
+        rapid_transactions = user_groups['timestamp'].diff() < timedelta(minutes=1)
+        rapid_indices = df_sorted.index[rapid_transactions.to_numpy()]
+        
+        self._apply_rule(df, rapid_indices, 0.25, 'Rapid consecutive transactions')
+        
+        # Check hourly transaction count
+        hour_group = df_sorted['timestamp'].dt.floor('h')
+        hourly_counts = df_sorted.groupby([df_sorted['user_id'], hour_group])['timestamp'].transform('size')
+        excessive_hourly = multi_transaction_users & (hourly_counts > self.settings['max_transactions_per_hour'])
+        hour_transactions = df_sorted.index[excessive_hourly.to_numpy()]
+        
+        self._apply_rule(df, hour_transactions, 0.2, 'High hourly velocity')
+        
+        # Check daily amount limits
+        date = df_sorted['timestamp'].dt.normalize()
+        daily_amounts = df_sorted.groupby([df_sorted['user_id'], date])['amount'].transform('sum')
+        excessive_daily = multi_transaction_users & (daily_amounts > self.settings['max_amount_per_day'])
+        date_transactions = df_sorted.index[excessive_daily.to_numpy()]
+        
+        self._apply_rule(df, date_transactions, 0.15, 'High daily amount')
         
         return df
     
-    def _check_location_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _check_location_patterns(self, df: pd.DataFrame, df_sorted: pd.DataFrame = None) -> pd.DataFrame:
         """Check for suspicious location patterns"""
         # Check for location velocity (impossible travel)
-        df_sorted = df.sort_values('timestamp')
-        
-        for user_id in df['user_id'].unique():
-            user_transactions = df_sorted[df_sorted['user_id'] == user_id].copy()
-            
-            if len(user_transactions) > 1:
-                # Simple location change detection
-                user_transactions['location_changed'] = (
-                    user_transactions['location'] != user_transactions['location'].shift(1)
-                )
-                user_transactions['time_diff'] = user_transactions['timestamp'].diff()
-                
-                # Flag rapid location changes (within 1 hour)
-                rapid_location_change = (
-                    user_transactions['location_changed'] & 
-                    (user_transactions['time_diff'] < timedelta(hours=1))
-                )
-                
-                rapid_indices = user_transactions[rapid_location_change].index
-                df.loc[rapid_indices, 'risk_score'] += 0.3
-                df.loc[rapid_indices, 'fraud_reasons'] += 'Rapid location change, '
+        if df_sorted is None:
+            df_sorted = self._sort_user_history(df)
+        
+        # Compare each row with the previous sorted row as integer codes (-1 marks missing)
+        user_codes = pd.factorize(df_sorted['user_id'])[0]
+        location_codes = pd.factorize(df_sorted['location'])[0]
+        timestamps = df_sorted['timestamp'].to_numpy()
+        
+        same_user = np.zeros(len(df_sorted), dtype=bool)
+        same_user[1:] = (user_codes[1:] == user_codes[:-1]) & (user_codes[1:] != -1)
+        same_user[1:] &= ~np.isnat(timestamps[1:]) & ~np.isnat(timestamps[:-1])
+        
+        # Simple location change detection against each user's previous transaction
+        location_changed = np.ones(len(df_sorted), dtype=bool)
+        location_changed[1:] = (
+            (location_codes[1:] != location_codes[:-1]) | (location_codes[1:] == -1) | (location_codes[:-1] == -1)
+        )
+        time_diff = np.zeros(len(df_sorted), dtype='timedelta64[ns]')
+        time_diff[1:] = timestamps[1:] - timestamps[:-1]
+        
+        # Flag rapid location changes (within 1 hour)
+        rapid_location_change = same_user & location_changed & (time_diff < np.timedelta64(1, 'h'))
+        
+        rapid_indices = df_sorted.index[rapid_location_change]
+        self._apply_rule(df, rapid_indices, 0.3, 'Rapid location change')
         
         # Check for high-risk locations (simplified - could be enhanced with real data)
         # This would typically use a database of known high-risk locations
-        high_risk_keywords = ['unknown', 'test', 'temp', 'null', '']
-        for keyword in high_risk_keywords:
-            high_risk_locations = df['location'].str.lower().str.contains(keyword, na=False)
-            df.loc[high_risk_locations, 'risk_score'] += 0.1
-            df.loc[high_risk_locations, 'fraud_reasons'] += 'High-risk location, '
+        high_risk_locations = df['location'].str.contains(HIGH_RISK_LOCATION_NAMES, na=False)
+        self._apply_rule(df, high_risk_locations, 0.1, 'High-risk location')
         
         return df
     
     def _check_merchant_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Check for suspicious merchant patterns"""
         # Check for new/unknown merchants
-        merchant_counts = df['merchant'].value_counts()
-        rare_merchants = merchant_counts[merchant_counts == 1].index
-        
-        rare_merchant_mask = df['merchant'].isin(rare_merchants)
-        df.loc[rare_merchant_mask, 'risk_score'] += 0.1
-        df.loc[rare_merchant_mask, 'fraud_reasons'] += 'New/rare merchant, '
+        merchant_counts = df.groupby('merchant', observed=True)['merchant'].transform('size')
+        rare_merchant_mask = (merchant_counts == 1).to_numpy()
+        self._apply_rule(df, rare_merchant_mask, 0.1, 'New/rare merchant')
         
         # Check for high-risk merchant categories
         high_risk_categories = ['gambling', 'adult', 'cryptocurrency', 'cash_advance']
+        category_lower = df['merchant_category'].str.lower()
         for category in high_risk_categories:
-            high_risk_mask = df['merchant_category'].str.lower().str.contains(category, na=False)
-            df.loc[high_risk_mask, 'risk_score'] += 0.15
-            df.loc[high_risk_mask, 'fraud_reasons'] += f'High-risk category ({category}), '
+            high_risk_mask = category_lower.str.contains(category, na=False, regex=False)
+            self._apply_rule(df, high_risk_mask, 0.15, f'High-risk category ({category})')
         
         # Check for merchant name anomalies
-        suspicious_keywords = ['test', 'temp', 'fake', 'dummy']
-        for keyword in suspicious_keywords:
-            suspicious_mask = df['merchant'].str.lower().str.contains(keyword, na=False)
-            df.loc[suspicious_mask, 'risk_score'] += 0.2
-            df.loc[suspicious_mask, 'fraud_reasons'] += 'Suspicious merchant name, '
+        suspicious_mask = df['merchant'].str.contains(SUSPICIOUS_MERCHANT_NAMES, na=False)
+        self._apply_rule(df, suspicious_mask, 0.2, 'Suspicious merchant name')
         
         return df
     
@@ -215,28 +240,37 @@ class FraudDetector:
         # Set fraud flag based on threshold
         df['is_fraud'] = df['risk_score'] >= self.settings['high_risk_threshold']
         
-        # Clean up fraud reasons (remove trailing commas and spaces)
-        df['fraud_reasons'] = df['fraud_reasons'].str.rstrip(', ')
+        # Decode reason bits once per distinct combination of triggered rules
+        codes, inverse = np.unique(df['reason_bits'].to_numpy(), return_inverse=True)
+        decoded = np.array([
+            ', '.join(reason for reason, bit in REASON_BITS.items() if code & bit)
+            for code in codes
+        ], dtype=object)
+        df['fraud_reasons'] = decoded[inverse]
         
         # Drop temporary columns
-        columns_to_drop = ['hour', 'day_of_week']
+        columns_to_drop = ['hour', 'day_of_week', 'reason_bits']
         df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
         
         return df
     
     def get_fraud_statistics(self, transactions: pd.DataFrame) -> Dict:
         """Generate fraud detection statistics"""
-        transactions_with_scores = self.detect_fraud(transactions)
+        # Frames that already carry scores are not run through the rules again
+        if {'risk_score', 'is_fraud'}.issubset(transactions.columns):
+            transactions_with_scores = transactions
+        else:
+            transactions_with_scores = self.detect_fraud(transactions)
+        
+        risk_scores = transactions_with_scores['risk_score'].to_numpy()
+        is_fraud = transactions_with_scores['is_fraud'].to_numpy(dtype=bool)
         
         total_transactions = len(transactions_with_scores)
-        fraud_transactions = len(transactions_with_scores[transactions_with_scores['is_fraud']])
-        high_risk_transactions = len(transactions_with_scores[transactions_with_scores['risk_score'] > 0.7])
-        medium_risk_transactions = len(transactions_with_scores[
-            (transactions_with_scores['risk_score'] > 0.4) & 
-            (transactions_with_scores['risk_score'] <= 0.7)
-        ])
-        
-        fraud_amount = transactions_with_scores[transactions_with_scores['is_fraud']]['amount'].sum()
+        fraud_transactions = int(np.count_nonzero(is_fraud))
+        high_risk_transactions = int(np.count_nonzero(risk_scores > 0.7))
+        medium_risk_transactions = int(np.count_nonzero((risk_scores > 0.4) & (risk_scores <= 0.7)))
+        
+        fraud_amount = transactions_with_scores.loc[is_fraud, 'amount'].sum()
         total_amount = transactions_with_scores['amount'].sum()
         
         return {
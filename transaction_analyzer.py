@@ -1,42 +1,249 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, NamedTuple
 import statistics
+import re
+
+# Keyword scans, compiled once at import
+SUSPICIOUS_NAMES = re.compile(r'test|temp|fake|unknown|null', re.IGNORECASE)
+SUSPICIOUS_LOCATIONS = re.compile(r'test|temp|fake|unknown|null', re.IGNORECASE)
+HIGH_RISK_CATEGORIES = re.compile(r'gambling|adult|cryptocurrency|cash advance|money transfer', re.IGNORECASE)
+
+# Rule names in bit order of the factor_flags returned by batch scoring; each
+# group's bits follow the previous group's, and the amount and temporal groups
+# line up with AMOUNT_FACTORS and TEMPORAL_FACTORS
+USER_RULES = ['new_user', 'amount_highly_unusual_for_user', 'amount_unusual_for_user',
+              'recent_transaction', 'high_daily_spending']
+AMOUNT_RULES = ['amount_top_1_percent', 'amount_top_5_percent', 'micro_amount',
+                'round_amount', 'round_amount_10', 'amount_outlier']
+TEMPORAL_RULES = ['off_hours', 'weekend', 'holiday', 'unusual_hour']
+LOCATION_RULES = ['new_location_for_user', 'rare_location_for_user', 'new_location_globally',
+                  'rare_location_globally', 'suspicious_location']
+MERCHANT_RULES = ['new_merchant_for_user', 'new_category_for_user', 'new_merchant_globally',
+                  'rare_merchant_globally', 'high_risk_category', 'suspicious_merchant']
+FACTOR_NAMES = USER_RULES + AMOUNT_RULES + TEMPORAL_RULES + LOCATION_RULES + MERCHANT_RULES
+
+# Score bands, highest first: the lowest bound a score must reach for each risk level
+# and each recommended (action, confidence, reasoning); lower scores get the last entry
+RISK_LEVELS = [(0.7, "HIGH"), (0.4, "MEDIUM"), (0.2, "LOW"), (0.0, "VERY LOW")]
+RECOMMENDATIONS = [
+    (0.8, ("BLOCK", "HIGH", "Multiple high-risk indicators detected")),
+    (0.6, ("REVIEW", "MEDIUM", "Several risk factors present, manual review recommended")),
+    (0.3, ("MONITOR", "LOW", "Some risk factors present, continue monitoring")),
+    (0.0, ("APPROVE", "HIGH", "Low risk transaction"))
+]
+
+# Time windows in nanoseconds, for comparisons on int64 epoch timestamps
+FIVE_MINUTES_NS = 5 * 60 * 10**9
+ONE_DAY_NS = 24 * 60 * 60 * 10**9
+
+class Transaction(NamedTuple):
+    """The fields of a transaction read by the analysis, as plain Python values"""
+    user_id: Any
+    amount: float
+    timestamp: pd.Timestamp
+    location: Any
+    merchant: Any
+    merchant_category: Any
+
+# Factor messages for the numeric rule kernels, in bit order of their flag masks
+AMOUNT_FACTORS = [
+    "Amount in top 1% of all transactions (${amount:,.2f})",
+    "Amount in top 5% of all transactions (${amount:,.2f})",
+    "Micro transaction amount (${amount:.2f})",
+    "Round amount (${amount:,.0f})",
+    "Round amount to nearest $10 (${amount:,.0f})",
+    "Statistical outlier (Z-score: {z_score:.2f})"
+]
+TEMPORAL_FACTORS = [
+    "Off-hours transaction ({hour:02d}:00)",
+    "Weekend transaction",
+    "Holiday transaction",
+    "Unusual hour for transactions (only {hour_count} historical transactions)"
+]
 
 class TransactionAnalyzer:
     def __init__(self):
         self.analysis_cache = {}
     
-    def analyze_single_transaction(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    @staticmethod
+    def _observed_counts(values: pd.Series) -> pd.Series:
+        """value_counts() limited to values present (categoricals also report unused categories)"""
+        counts = values.value_counts()
+        return counts[counts > 0]
+    
+    @staticmethod
+    def _most_common(counts: pd.Series):
+        """Most frequent value from _observed_counts(), breaking ties like Series.mode()"""
+        if counts.empty:
+            return 'Unknown'
+        return counts[counts == counts.iloc[0]].sort_index().index[0]
+    
+    def refresh(self):
+        """Drop cached statistics so the next analysis recomputes them"""
+        self.analysis_cache.clear()
+    
+    @staticmethod
+    def _category_codes(values: pd.Series) -> Tuple[np.ndarray, pd.Index, Dict[Any, int]]:
+        """Integer codes of a column, its categories and the code of each value (-1 codes are missing)"""
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        categories = values.cat.categories
+        return values.cat.codes.to_numpy(), categories, dict(zip(categories, range(len(categories))))
+    
+    @staticmethod
+    def _code_counts(column_codes: Tuple[np.ndarray, pd.Index, Dict[Any, int]]) -> Dict[Any, int]:
+        """Occurrences of every category, counted from _category_codes() output"""
+        codes, categories, _ = column_codes
+        return dict(zip(categories, np.bincount(codes[codes >= 0], minlength=len(categories)).tolist()))
+    
+    def prepare_context(self, historical_data: pd.DataFrame) -> Dict[str, Any]:
+        """Precompute per-user row groups and global statistics shared by every analysis"""
+        # Reuse the last context while the same, unchanged frame is analyzed
+        fingerprint = (len(historical_data), historical_data['amount'].iloc[-1] if len(historical_data) else None)
+        cached = self.analysis_cache.get('context')
+        if cached is not None and cached[0] is historical_data and cached[1] == fingerprint:
+            return cached[2]
+        
+        amount_stats = historical_data['amount'].describe(percentiles=[0.75, 0.95, 0.99])
+        codes = {
+            column: self._category_codes(historical_data[column])
+            for column in ['location', 'merchant', 'merchant_category']
+        }
+        user_amount_stats = historical_data.groupby('user_id', sort=False)['amount'].agg(['mean', 'std'])
+        daily_totals = historical_data['amount'].groupby(
+            [historical_data['user_id'], historical_data['timestamp'].dt.normalize()]
+        ).sum()
+        
+        context = {
+            'user_rows': historical_data.groupby('user_id', sort=False).indices,
+            # Column arrays gathered by user_rows, so user checks skip DataFrame slicing
+            'amounts': historical_data['amount'].to_numpy(dtype=float),
+            'timestamps': historical_data['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64'),
+            # Categorical codes, so per-user location and merchant checks compare integers
+            'codes': codes,
+            # Per-user amount (mean, std) and average daily spend, looked up in O(1)
+            'user_amount_stats': dict(zip(
+                user_amount_stats.index, zip(user_amount_stats['mean'], user_amount_stats['std'])
+            )),
+            'avg_daily_spending': daily_totals.groupby(level=0).mean().to_dict(),
+            'amount_stats': {
+                'mean': amount_stats['mean'],
+                'std': amount_stats['std'],
+                'median': amount_stats['50%'],
+                'q75': amount_stats['75%'],
+                'q95': amount_stats['95%'],
+                'q99': amount_stats['99%']
+            },
+            # Global frequencies: an hour histogram and per-value dicts counted from the codes,
+            # answering both "seen before?" and "how often?" with one O(1) lookup
+            'hour_counts': np.bincount(historical_data['timestamp'].dt.hour.dropna().to_numpy(dtype=int), minlength=24),
+            'location_counts': self._code_counts(codes['location']),
+            'merchant_counts': self._code_counts(codes['merchant']),
+            'sorted_amounts': np.sort(historical_data['amount'].to_numpy())
+        }
+        self.analysis_cache['context'] = (historical_data, fingerprint, context)
+        
+        return context
+    
+    @staticmethod
+    def _combine_rules(rules: List[Tuple[np.ndarray, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum rule scores where each mask holds and record which rules fired as a bitmask"""
+        risk = np.zeros(len(rules[0][0]))
+        flags = np.zeros(len(rules[0][0]), dtype=np.uint32)
+        for bit, (mask, score) in enumerate(rules):
+            risk = risk + np.where(mask, score, 0.0)
+            flags |= mask.astype(np.uint32) << bit
+        return risk, flags
+    
+    @staticmethod
+    def _factor_messages(templates: List[str], flags, **values) -> List[str]:
+        """Format the messages of the rules whose bits are set in flags"""
+        return [template.format(**values) for bit, template in enumerate(templates) if (int(flags) >> bit) & 1]
+    
+    def factor_names(self, factor_flags) -> List[str]:
+        """Decode a factor_flags value from analyze_transactions_batch into FACTOR_NAMES"""
+        return [name for bit, name in enumerate(FACTOR_NAMES) if (int(factor_flags) >> bit) & 1]
+    
+    def _score_amounts(self, amount: np.ndarray, global_stats: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Amount rule scores, AMOUNT_FACTORS flags and global z-scores for an array of amounts"""
+        if global_stats['std'] > 0:
+            z_score = np.abs((amount - global_stats['mean']) / global_stats['std'])
+        else:
+            z_score = np.zeros(len(amount))
+        top_one = amount > global_stats['q99']
+        round_hundred = (amount >= 100) & (np.mod(amount, 100) == 0)
+        risk, flags = self._combine_rules([
+            (top_one, 0.3),
+            (~top_one & (amount > global_stats['q95']), 0.15),
+            (amount < 1.0, 0.15),
+            (round_hundred, 0.1),
+            (~round_hundred & (amount >= 10) & (np.mod(amount, 10) == 0), 0.05),
+            (z_score > 3, 0.2)
+        ])
+        return risk, flags, z_score
+    
+    def _score_times(self, hour: np.ndarray, day_of_week: np.ndarray, month: np.ndarray, day: np.ndarray,
+                     hour_count: np.ndarray, history_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Temporal rule scores and TEMPORAL_FACTORS flags for arrays of time parts"""
+        return self._combine_rules([
+            ((hour >= 22) | (hour <= 6), 0.15),
+            (day_of_week >= 5, 0.05),
+            (((month == 1) & (day == 1)) | ((month == 12) & (day == 25)), 0.1),
+            (hour_count < history_size * 0.01, 0.1)
+        ])
+    
+    def _user_rows(self, user_id, context: Dict[str, Any]) -> np.ndarray:
+        """Positions of user_id's rows in the historical data"""
+        return context['user_rows'].get(user_id, np.empty(0, dtype=int))
+    
+    def _user_code_counts(self, column: str, value, user_rows: np.ndarray,
+                          context: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Distinct codes of column in the user's rows, their counts, and the code of value"""
+        codes, _, code_of = context['codes'][column]
+        user_codes = codes[user_rows]
+        user_codes, counts = np.unique(user_codes[user_codes >= 0], return_counts=True)
+        return user_codes, counts, code_of.get(value, -1)
+    
+    def analyze_single_transaction(self, transaction, historical_data: pd.DataFrame,
+                                   context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Analyze a single transaction and provide detailed risk assessment
+        Analyze a single transaction and provide detailed risk assessment.
+        The transaction may be a row Series, a dict or a Transaction.
+        Pass a context from prepare_context() to reuse it across transactions.
         """
+        if context is None:
+            context = self.prepare_context(historical_data)
+        if not isinstance(transaction, Transaction):
+            # Read the fields once instead of indexing the row in every helper
+            transaction = Transaction(*(transaction[field] for field in Transaction._fields))
+        
         risk_factors = []
         risk_score = 0.0
         
         # User behavior analysis
-        user_analysis = self._analyze_user_behavior(transaction, historical_data)
+        user_analysis = self._analyze_user_behavior(transaction, historical_data, context)
         risk_score += user_analysis['risk_contribution']
         risk_factors.extend(user_analysis['factors'])
         
         # Amount analysis
-        amount_analysis = self._analyze_amount_patterns(transaction, historical_data)
+        amount_analysis = self._analyze_amount_patterns(transaction, historical_data, context)
         risk_score += amount_analysis['risk_contribution']
         risk_factors.extend(amount_analysis['factors'])
         
         # Temporal analysis
-        temporal_analysis = self._analyze_temporal_patterns(transaction, historical_data)
+        temporal_analysis = self._analyze_temporal_patterns(transaction, historical_data, context)
         risk_score += temporal_analysis['risk_contribution']
         risk_factors.extend(temporal_analysis['factors'])
         
         # Location analysis
-        location_analysis = self._analyze_location_patterns(transaction, historical_data)
+        location_analysis = self._analyze_location_patterns(transaction, historical_data, context)
         risk_score += location_analysis['risk_contribution']
         risk_factors.extend(location_analysis['factors'])
         
         # Merchant analysis
-        merchant_analysis = self._analyze_merchant_patterns(transaction, historical_data)
+        merchant_analysis = self._analyze_merchant_patterns(transaction, historical_data, context)
         risk_score += merchant_analysis['risk_contribution']
         risk_factors.extend(merchant_analysis['factors'])
         
@@ -54,16 +261,162 @@ class TransactionAnalyzer:
             'recommendation': self._get_recommendation(risk_score, risk_factors)
         }
     
-    def _analyze_user_behavior(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_transactions_batch(self, transactions: pd.DataFrame, historical_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score many transactions at once with column-wide operations.
+        Risk contributions follow the same rules as analyze_single_transaction; instead of
+        factor messages each row gets a factor_flags bitmask, decoded with factor_names().
+        """
+        n = len(transactions)
+        context = self.prepare_context(historical_data)
+        amount = transactions['amount'].to_numpy(dtype=float)
+        timestamps = transactions['timestamp']
+        
+        # Encode users as int32 codes once; per-user arrays are then indexed by code,
+        # with unknown users (code -1) picking the trailing missing value
+        history_codes, users = pd.factorize(historical_data['user_id'])
+        history_codes = history_codes.astype(np.int32)
+        user_codes = pd.Index(users).get_indexer(transactions['user_id']).astype(np.int32)
+        has_history = user_codes >= 0
+        
+        def per_user(values, missing=np.nan):
+            return np.append(np.asarray(values), missing)[user_codes]
+        
+        # User behavior: every per-user history statistic in one grouped pass, mapped onto each row
+        history = pd.DataFrame({
+            'user': history_codes,
+            'timestamp': context['timestamps'],
+            'amount': context['amounts']
+        })
+        user_stats = history.groupby('user').agg(
+            size=('amount', 'size'), mean=('amount', 'mean'), std=('amount', 'std'),
+            sum=('amount', 'sum'), last=('timestamp', 'max')
+        )
+        user_count = per_user(user_stats['size'].to_numpy(dtype=float), 0.0)
+        user_mean = per_user(user_stats['mean'])
+        user_std = per_user(user_stats['std'])
+        user_last = per_user(user_stats['last'], 0)
+        timestamps_ns = timestamps.to_numpy(dtype='datetime64[ns]').view('int64')
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            user_z = np.abs((amount - user_mean) / user_std)
+        user_z = np.where(has_history & (user_std > 0), user_z, 0.0)
+        recent_user_transaction = timestamps_ns - user_last < FIVE_MINUTES_NS
+        
+        # History inside each row's trailing day: everything after (timestamp - 1 day)
+        history = history.sort_values('timestamp', kind='stable')
+        history_groups = history.groupby('user')
+        history = history.assign(
+            count_before=history_groups.cumcount() + 1,
+            amount_before=history_groups['amount'].cumsum()
+        )
+        queries = pd.DataFrame({
+            'user': user_codes,
+            'cutoff': timestamps_ns - ONE_DAY_NS,
+            'row': np.arange(n)
+        })[has_history].sort_values('cutoff', kind='stable')
+        window = pd.merge_asof(
+            queries, history[['user', 'timestamp', 'count_before', 'amount_before']],
+            left_on='cutoff', right_on='timestamp', by='user', direction='backward'
+        )
+        recent_count = np.zeros(n)
+        recent_amount = np.zeros(n)
+        rows = window['row'].to_numpy()
+        recent_count[rows] = user_count[rows] - window['count_before'].fillna(0).to_numpy()
+        recent_amount[rows] = (
+            user_stats['sum'].to_numpy()[user_codes[rows]] - window['amount_before'].fillna(0).to_numpy()
+        )
+        avg_daily_spending = per_user(pd.Index(users).map(context['avg_daily_spending']).to_numpy(dtype=float))
+        high_daily_spending = (recent_count > 0) & (recent_amount + amount > avg_daily_spending * 3)
+        
+        user_risk, user_flags = self._combine_rules([
+            (~has_history, 0.3),
+            (user_z > 3, 0.25),
+            ((user_z <= 3) & (user_z > 2), 0.15),
+            (has_history & recent_user_transaction, 0.2),
+            (has_history & high_daily_spending, 0.2)
+        ])
+        
+        # Amount and temporal patterns share the numeric kernels of the single analysis
+        amount_risk, amount_flags, _ = self._score_amounts(amount, context['amount_stats'])
+        hour = timestamps.dt.hour.to_numpy()
+        hour_count = context['hour_counts'][hour]
+        temporal_risk, temporal_flags = self._score_times(
+            hour, timestamps.dt.dayofweek.to_numpy(), timestamps.dt.month.to_numpy(),
+            timestamps.dt.day.to_numpy(), hour_count, len(historical_data)
+        )
+        
+        # Location and merchant patterns: per-user and global frequencies
+        def pair_counts(column):
+            counts = historical_data.groupby([history_codes, historical_data[column]], observed=True).size()
+            keys = pd.MultiIndex.from_arrays([user_codes, transactions[column].to_numpy()])
+            return counts.reindex(keys).fillna(0).to_numpy()
+        
+        def global_counts(column):
+            return transactions[column].map(context[f'{column}_counts']).astype(float).fillna(0).to_numpy()
+        
+        # Keyword checks run once per distinct value and are broadcast back by code
+        def keyword_hits(column, pattern):
+            codes, uniques = pd.factorize(transactions[column])
+            hits = pd.Index(uniques).astype(str).str.contains(pattern)
+            return np.append(np.asarray(hits, dtype=bool), False)[codes]
+        
+        user_location_count = pair_counts('location')
+        global_location_count = global_counts('location')
+        
+        location_risk, location_flags = self._combine_rules([
+            (has_history & (user_location_count == 0), 0.2),
+            (has_history & (user_location_count == 1), 0.1),
+            (global_location_count == 0, 0.15),
+            ((global_location_count > 0) & (global_location_count < 5), 0.1),
+            (keyword_hits('location', SUSPICIOUS_LOCATIONS), 0.25)
+        ])
+        
+        user_merchant_count = pair_counts('merchant')
+        user_category_count = pair_counts('merchant_category')
+        global_merchant_count = global_counts('merchant')
+        
+        merchant_risk, merchant_flags = self._combine_rules([
+            (has_history & (user_merchant_count == 0), 0.1),
+            (has_history & (user_category_count == 0), 0.15),
+            (global_merchant_count == 0, 0.15),
+            ((global_merchant_count > 0) & (global_merchant_count < 5), 0.1),
+            (keyword_hits('merchant_category', HIGH_RISK_CATEGORIES), 0.2),
+            (keyword_hits('merchant', SUSPICIOUS_NAMES), 0.25)
+        ])
+        
+        risk_score = np.minimum(user_risk + amount_risk + temporal_risk + location_risk + merchant_risk, 1.0)
+        
+        # Pack each group's rule bits after the previous group's
+        factor_flags = np.zeros(n, dtype=np.uint32)
+        offset = 0
+        for rules, flags in [(USER_RULES, user_flags), (AMOUNT_RULES, amount_flags), (TEMPORAL_RULES, temporal_flags),
+                             (LOCATION_RULES, location_flags), (MERCHANT_RULES, merchant_flags)]:
+            factor_flags |= flags << np.uint32(offset)
+            offset += len(rules)
+        
+        return pd.DataFrame({
+            'user_risk': user_risk,
+            'amount_risk': amount_risk,
+            'temporal_risk': temporal_risk,
+            'location_risk': location_risk,
+            'merchant_risk': merchant_risk,
+            'risk_score': risk_score,
+            'factor_flags': factor_flags,
+            'risk_level': self._score_bands(risk_score, RISK_LEVELS),
+            'action': self._score_bands(risk_score, [(bound, band[0]) for bound, band in RECOMMENDATIONS])
+        }, index=transactions.index)
+    
+    def _analyze_user_behavior(self, transaction: Transaction, historical_data: pd.DataFrame,
+                               context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze user behavior patterns"""
-        user_id = transaction['user_id']
-        user_transactions = historical_data[historical_data['user_id'] == user_id]
+        user_rows = self._user_rows(transaction.user_id, context)
         
         risk_contribution = 0.0
         factors = []
         analysis_details = {}
         
-        if len(user_transactions) == 0:
+        if len(user_rows) == 0:
             # New user - higher risk
             risk_contribution += 0.3
             factors.append("New user - no transaction history")
@@ -71,18 +424,19 @@ class TransactionAnalyzer:
             analysis_details['transaction_count'] = 0
         else:
             analysis_details['is_new_user'] = False
-            analysis_details['transaction_count'] = len(user_transactions)
+            analysis_details['transaction_count'] = len(user_rows)
+            user_amounts = context['amounts'][user_rows]
+            user_timestamps = context['timestamps'][user_rows]
             
-            # Calculate user statistics
-            avg_amount = user_transactions['amount'].mean()
-            std_amount = user_transactions['amount'].std()
+            # User statistics, precomputed per user in the context
+            avg_amount, std_amount = context['user_amount_stats'][transaction.user_id]
             
             analysis_details['avg_amount'] = avg_amount
             analysis_details['std_amount'] = std_amount
             
             # Check if current transaction is unusual for this user
             if std_amount > 0:
-                z_score = abs((transaction['amount'] - avg_amount) / std_amount)
+                z_score = abs((transaction.amount - avg_amount) / std_amount)
                 analysis_details['amount_z_score'] = z_score
                 
                 if z_score > 3:
@@ -93,25 +447,21 @@ class TransactionAnalyzer:
                     factors.append(f"Amount somewhat unusual for user (Z-score: {z_score:.2f})")
             
             # Check transaction frequency
-            last_transaction = user_transactions['timestamp'].max()
-            time_since_last = transaction['timestamp'] - last_transaction
+            timestamp_ns = transaction.timestamp.value
+            time_since_last = timestamp_ns - user_timestamps.max()
             
-            analysis_details['time_since_last_transaction'] = time_since_last
+            analysis_details['time_since_last_transaction'] = pd.Timedelta(time_since_last)
             
-            if time_since_last < timedelta(minutes=5):
+            if time_since_last < FIVE_MINUTES_NS:
                 risk_contribution += 0.2
                 factors.append("Very recent transaction from same user")
             
             # Check for unusual spending patterns
-            recent_transactions = user_transactions[
-                user_transactions['timestamp'] > (transaction['timestamp'] - timedelta(days=1))
-            ]
+            recent = user_timestamps > timestamp_ns - ONE_DAY_NS
             
-            if len(recent_transactions) > 0:
-                daily_spending = recent_transactions['amount'].sum() + transaction['amount']
-                avg_daily_spending = user_transactions.groupby(
-                    user_transactions['timestamp'].dt.date
-                )['amount'].sum().mean()
+            if recent.any():
+                daily_spending = user_amounts[recent].sum() + transaction.amount
+                avg_daily_spending = context['avg_daily_spending'][transaction.user_id]
                 
                 analysis_details['daily_spending'] = daily_spending
                 analysis_details['avg_daily_spending'] = avg_daily_spending
@@ -126,55 +476,29 @@ class TransactionAnalyzer:
             'details': analysis_details
         }
     
-    def _analyze_amount_patterns(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_amount_patterns(self, transaction: Transaction, historical_data: pd.DataFrame,
+                                 context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze transaction amount patterns"""
-        amount = transaction['amount']
+        amount = transaction.amount
         risk_contribution = 0.0
         factors = []
         analysis_details = {}
         
-        # Calculate global statistics
-        global_stats = {
-            'mean': historical_data['amount'].mean(),
-            'std': historical_data['amount'].std(),
-            'median': historical_data['amount'].median(),
-            'q75': historical_data['amount'].quantile(0.75),
-            'q95': historical_data['amount'].quantile(0.95),
-            'q99': historical_data['amount'].quantile(0.99)
-        }
+        # Global statistics
+        global_stats = context['amount_stats']
         
         analysis_details['global_stats'] = global_stats
-        analysis_details['amount_percentile'] = (historical_data['amount'] < amount).mean()
-        
-        # Very large amounts
-        if amount > global_stats['q99']:
-            risk_contribution += 0.3
-            factors.append(f"Amount in top 1% of all transactions (${amount:,.2f})")
-        elif amount > global_stats['q95']:
-            risk_contribution += 0.15
-            factors.append(f"Amount in top 5% of all transactions (${amount:,.2f})")
-        
-        # Very small amounts (potential testing)
-        if amount < 1.0:
-            risk_contribution += 0.15
-            factors.append(f"Micro transaction amount (${amount:.2f})")
-        
-        # Round amounts (potential fraud indicator)
-        if amount >= 100 and amount % 100 == 0:
-            risk_contribution += 0.1
-            factors.append(f"Round amount (${amount:,.0f})")
-        elif amount >= 10 and amount % 10 == 0:
-            risk_contribution += 0.05
-            factors.append(f"Round amount to nearest $10 (${amount:,.0f})")
-        
-        # Statistical outlier check
+        # Share of historical amounts below this one, by binary search on the sorted amounts
+        analysis_details['amount_percentile'] = (
+            np.searchsorted(context['sorted_amounts'], amount, side='left') / len(historical_data)
+        )
+        
+        # Large, micro, round and outlying amounts
+        risk, flags, z_score = self._score_amounts(np.array([amount], dtype=float), global_stats)
+        risk_contribution += float(risk[0])
+        factors.extend(self._factor_messages(AMOUNT_FACTORS, flags[0], amount=amount, z_score=z_score[0]))
         if global_stats['std'] > 0:
-            z_score = abs((amount - global_stats['mean']) / global_stats['std'])
-            analysis_details['z_score'] = z_score
-            
-            if z_score > 3:
-                risk_contribution += 0.2
-                factors.append(f"Statistical outlier (Z-score: {z_score:.2f})")
+            analysis_details['z_score'] = z_score[0]
         
         return {
             'risk_contribution': risk_contribution,
@@ -182,9 +506,10 @@ class TransactionAnalyzer:
             'details': analysis_details
         }
     
-    def _analyze_temporal_patterns(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_temporal_patterns(self, transaction: Transaction, historical_data: pd.DataFrame,
+                                   context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze temporal patterns"""
-        timestamp = transaction['timestamp']
+        timestamp = transaction.timestamp
         risk_contribution = 0.0
         factors = []
         analysis_details = {}
@@ -197,35 +522,18 @@ class TransactionAnalyzer:
         analysis_details['day_of_week'] = day_of_week
         analysis_details['is_weekend'] = day_of_week >= 5
         
-        # Off-hours transactions (10 PM to 6 AM)
-        if hour >= 22 or hour <= 6:
-            risk_contribution += 0.15
-            factors.append(f"Off-hours transaction ({hour:02d}:00)")
-            analysis_details['is_off_hours'] = True
-        else:
-            analysis_details['is_off_hours'] = False
+        # Off-hours (10 PM to 6 AM), weekend, holiday (January 1st or December 25th) and rare hours
+        hour_transaction_count = int(context['hour_counts'][hour])
+        risk, flags = self._score_times(
+            np.array([hour]), np.array([day_of_week]), np.array([timestamp.month]), np.array([timestamp.day]),
+            np.array([hour_transaction_count]), len(historical_data)
+        )
+        risk_contribution += float(risk[0])
+        factors.extend(self._factor_messages(TEMPORAL_FACTORS, flags[0], hour=hour, hour_count=hour_transaction_count))
         
-        # Weekend transactions
-        if day_of_week >= 5:
-            risk_contribution += 0.05
-            factors.append("Weekend transaction")
-        
-        # Holiday check (simplified - would need holiday calendar in production)
-        # For now, check if it's January 1st or December 25th
-        if (timestamp.month == 1 and timestamp.day == 1) or (timestamp.month == 12 and timestamp.day == 25):
-            risk_contribution += 0.1
-            factors.append("Holiday transaction")
-            analysis_details['is_holiday'] = True
-        else:
-            analysis_details['is_holiday'] = False
-        
-        # Analyze historical patterns for this hour
-        hour_transactions = historical_data[historical_data['timestamp'].dt.hour == hour]
-        analysis_details['hour_transaction_count'] = len(hour_transactions)
-        
-        if len(hour_transactions) < len(historical_data) * 0.01:  # Less than 1% of transactions
-            risk_contribution += 0.1
-            factors.append(f"Unusual hour for transactions (only {len(hour_transactions)} historical transactions)")
+        analysis_details['is_off_hours'] = bool(flags[0] & 1)
+        analysis_details['is_holiday'] = bool(flags[0] & 4)
+        analysis_details['hour_transaction_count'] = hour_transaction_count
         
         return {
             'risk_contribution': risk_contribution,
@@ -233,48 +541,52 @@ class TransactionAnalyzer:
             'details': analysis_details
         }
     
-    def _analyze_location_patterns(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_location_patterns(self, transaction: Transaction, historical_data: pd.DataFrame,
+                                   context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze location patterns"""
-        location = transaction['location']
-        user_id = transaction['user_id']
+        location = transaction.location
         risk_contribution = 0.0
         factors = []
         analysis_details = {}
         
-        # User's location history
-        user_transactions = historical_data[historical_data['user_id'] == user_id]
-        user_locations = user_transactions['location'].value_counts()
+        # User's location history, as location codes and their counts
+        user_rows = self._user_rows(transaction.user_id, context)
+        user_locations, location_counts, location_code = self._user_code_counts(
+            'location', location, user_rows, context
+        )
+        location_frequency = location_counts[user_locations == location_code].sum()
         
         analysis_details['user_location_count'] = len(user_locations)
-        analysis_details['is_new_location'] = location not in user_locations.index
+        analysis_details['is_new_location'] = bool(location_frequency == 0)
         
         if len(user_locations) > 0:
-            analysis_details['most_common_location'] = user_locations.index[0]
-            analysis_details['location_frequency'] = user_locations.get(location, 0)
+            # Highest count, ties going to the lowest value (as in the user profile's mode)
+            most_common_code = user_locations[np.argmax(location_counts)]
+            analysis_details['most_common_location'] = context['codes']['location'][1][most_common_code]
+            analysis_details['location_frequency'] = location_frequency
             
             # New location for user
-            if location not in user_locations.index:
+            if location_frequency == 0:
                 risk_contribution += 0.2
                 factors.append("New location for this user")
-            elif user_locations[location] == 1:
+            elif location_frequency == 1:
                 risk_contribution += 0.1
                 factors.append("Rarely used location for this user")
         
         # Global location analysis
-        global_locations = historical_data['location'].value_counts()
-        analysis_details['global_location_frequency'] = global_locations.get(location, 0)
+        global_location_frequency = context['location_counts'].get(location, 0)
+        analysis_details['global_location_frequency'] = global_location_frequency
         
         # Uncommon location globally
-        if location not in global_locations.index:
+        if global_location_frequency == 0:
             risk_contribution += 0.15
             factors.append("New location globally")
-        elif global_locations[location] < 5:
+        elif global_location_frequency < 5:
             risk_contribution += 0.1
             factors.append("Rarely used location globally")
         
         # Check for suspicious location names
-        suspicious_keywords = ['test', 'temp', 'fake', 'unknown', 'null', '']
-        if any(keyword.lower() in location.lower() for keyword in suspicious_keywords):
+        if SUSPICIOUS_LOCATIONS.search(location):
             risk_contribution += 0.25
             factors.append("Suspicious location name")
         
@@ -284,57 +596,55 @@ class TransactionAnalyzer:
             'details': analysis_details
         }
     
-    def _analyze_merchant_patterns(self, transaction: pd.Series, historical_data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_merchant_patterns(self, transaction: Transaction, historical_data: pd.DataFrame,
+                                   context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze merchant patterns"""
-        merchant = transaction['merchant']
-        merchant_category = transaction['merchant_category']
-        user_id = transaction['user_id']
+        merchant = transaction.merchant
+        merchant_category = transaction.merchant_category
         risk_contribution = 0.0
         factors = []
         analysis_details = {}
         
-        # User's merchant history
-        user_transactions = historical_data[historical_data['user_id'] == user_id]
-        user_merchants = user_transactions['merchant'].value_counts()
-        user_categories = user_transactions['merchant_category'].value_counts()
+        # User's merchant and category history, as codes
+        user_rows = self._user_rows(transaction.user_id, context)
+        user_merchants, _, merchant_code = self._user_code_counts('merchant', merchant, user_rows, context)
+        user_categories, _, category_code = self._user_code_counts(
+            'merchant_category', merchant_category, user_rows, context
+        )
         
         analysis_details['user_merchant_count'] = len(user_merchants)
         analysis_details['user_category_count'] = len(user_categories)
         
         # New merchant for user
         if len(user_merchants) > 0:
-            if merchant not in user_merchants.index:
+            if merchant_code not in user_merchants:
                 risk_contribution += 0.1
                 factors.append("New merchant for this user")
             
             # New category for user
-            if merchant_category not in user_categories.index:
+            if category_code not in user_categories:
                 risk_contribution += 0.15
                 factors.append("New merchant category for this user")
         
         # Global merchant analysis
-        global_merchants = historical_data['merchant'].value_counts()
-        global_categories = historical_data['merchant_category'].value_counts()
-        
-        analysis_details['global_merchant_frequency'] = global_merchants.get(merchant, 0)
+        global_merchant_frequency = context['merchant_counts'].get(merchant, 0)
+        analysis_details['global_merchant_frequency'] = global_merchant_frequency
         
         # New merchant globally
-        if merchant not in global_merchants.index:
+        if global_merchant_frequency == 0:
             risk_contribution += 0.15
             factors.append("New merchant globally")
-        elif global_merchants[merchant] < 5:
+        elif global_merchant_frequency < 5:
             risk_contribution += 0.1
             factors.append("Rarely used merchant")
         
         # High-risk merchant categories
-        high_risk_categories = ['gambling', 'adult', 'cryptocurrency', 'cash advance', 'money transfer']
-        if any(risk_cat.lower() in merchant_category.lower() for risk_cat in high_risk_categories):
+        if HIGH_RISK_CATEGORIES.search(merchant_category):
             risk_contribution += 0.2
             factors.append(f"High-risk merchant category: {merchant_category}")
         
         # Suspicious merchant names
-        suspicious_keywords = ['test', 'temp', 'fake', 'unknown', 'null']
-        if any(keyword.lower() in merchant.lower() for keyword in suspicious_keywords):
+        if SUSPICIOUS_NAMES.search(merchant):
             risk_contribution += 0.25
             factors.append("Suspicious merchant name")
         
@@ -344,24 +654,24 @@ class TransactionAnalyzer:
             'details': analysis_details
         }
     
+    @staticmethod
+    def _score_band(risk_score: float, bands: List[Tuple[float, Any]]) -> Any:
+        """Value of the first band whose lower bound the score reaches"""
+        for bound, value in bands[:-1]:
+            if risk_score >= bound:
+                return value
+        return bands[-1][1]
+    
+    @staticmethod
+    def _score_bands(risk_scores: np.ndarray, bands: List[Tuple[float, Any]]) -> np.ndarray:
+        """Vectorized _score_band over an array of scores"""
+        return np.select(
+            [risk_scores >= bound for bound, _ in bands[:-1]], [value for _, value in bands[:-1]], bands[-1][1]
+        )
+    
     def _get_recommendation(self, risk_score: float, risk_factors: List[str]) -> Dict[str, Any]:
         """Generate recommendation based on risk analysis"""
-        if risk_score >= 0.8:
-            action = "BLOCK"
-            confidence = "HIGH"
-            reasoning = "Multiple high-risk indicators detected"
-        elif risk_score >= 0.6:
-            action = "REVIEW"
-            confidence = "MEDIUM"
-            reasoning = "Several risk factors present, manual review recommended"
-        elif risk_score >= 0.3:
-            action = "MONITOR"
-            confidence = "LOW"
-            reasoning = "Some risk factors present, continue monitoring"
-        else:
-            action = "APPROVE"
-            confidence = "HIGH"
-            reasoning = "Low risk transaction"
+        action, confidence, reasoning = self._score_band(risk_score, RECOMMENDATIONS)
         
         return {
             'action': action,
@@ -373,14 +683,7 @@ class TransactionAnalyzer:
     
     def _get_risk_level(self, risk_score: float) -> str:
         """Convert risk score to risk level"""
-        if risk_score >= 0.7:
-            return "HIGH"
-        elif risk_score >= 0.4:
-            return "MEDIUM"
-        elif risk_score >= 0.2:
-            return "LOW"
-        else:
-            return "VERY LOW"
+        return self._score_band(risk_score, RISK_LEVELS)
     
     def generate_user_profile(self, user_id: str, historical_data: pd.DataFrame) -> Dict[str, Any]:
         """Generate comprehensive user profile for fraud analysis"""
@@ -389,6 +692,11 @@ class TransactionAnalyzer:
         if len(user_transactions) == 0:
             return {'error': 'No transactions found for user'}
         
+        # Frequency tables computed once and shared by the counts, modes and distributions
+        location_counts = self._observed_counts(user_transactions['location'])
+        merchant_counts = self._observed_counts(user_transactions['merchant'])
+        category_counts = self._observed_counts(user_transactions['merchant_category'])
+        
         profile = {
             'user_id': user_id,
             'total_transactions': len(user_transactions),
@@ -406,15 +714,15 @@ class TransactionAnalyzer:
                 'max_amount': user_transactions['amount'].max()
             },
             'location_patterns': {
-                'unique_locations': user_transactions['location'].nunique(),
-                'most_common_location': user_transactions['location'].mode().iloc[0] if not user_transactions['location'].mode().empty else 'Unknown',
-                'location_distribution': user_transactions['location'].value_counts().to_dict()
+                'unique_locations': len(location_counts),
+                'most_common_location': self._most_common(location_counts),
+                'location_distribution': location_counts.to_dict()
             },
             'merchant_patterns': {
-                'unique_merchants': user_transactions['merchant'].nunique(),
-                'unique_categories': user_transactions['merchant_category'].nunique(),
-                'most_common_merchant': user_transactions['merchant'].mode().iloc[0] if not user_transactions['merchant'].mode().empty else 'Unknown',
-                'category_distribution': user_transactions['merchant_category'].value_counts().to_dict()
+                'unique_merchants': len(merchant_counts),
+                'unique_categories': len(category_counts),
+                'most_common_merchant': self._most_common(merchant_counts),
+                'category_distribution': category_counts.to_dict()
             },
             'temporal_patterns': {
                 'transactions_by_hour': user_transactions.groupby(user_transactions['timestamp'].dt.hour).size().to_dict(),
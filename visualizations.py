@@ -3,7 +3,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+import weakref
 from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
 
 class Visualizations:
     def __init__(self):
@@ -15,15 +17,110 @@ class Visualizations:
             'success': '#2ca02c',
             'info': '#17a2b8'
         }
+        self._frame_cache = {}
+    
+    def _memoized(self, transactions_df: pd.DataFrame, name: Any,
+                  compute: Callable[[pd.DataFrame], Any]) -> Any:
+        """compute(transactions_df), cached only for as long as the frame itself is alive"""
+        key = (id(transactions_df), name)
+        cached = self._frame_cache.get(key)
+        if cached is not None and cached[0]() is transactions_df:
+            return cached[1]
+        
+        # Entries hold a weak reference, so filtered frames from earlier reruns are not
+        # pinned; the callback drops an entry as soon as its frame is collected
+        def forget(ref, key=key):
+            if self._frame_cache.get(key, (None,))[0] is ref:
+                del self._frame_cache[key]
+        
+        value = compute(transactions_df)
+        self._frame_cache[key] = (weakref.ref(transactions_df, forget), value)
+        return value
+    
+    def _group_stats(self, transactions_df: pd.DataFrame, col: str) -> pd.DataFrame:
+        """Per-group count, amount, risk and fraud aggregates, memoized per frame and column"""
+        return self._memoized(transactions_df, ('group', col),
+                              lambda frame: self._build_group_stats(frame, col))
+    
+    def _build_group_stats(self, transactions_df: pd.DataFrame, col: str) -> pd.DataFrame:
+        """Compute the aggregates behind _group_stats"""
+        aggregations = {
+            'transaction_count': ('transaction_id', 'count'),
+            'total_amount': ('amount', 'sum'),
+            'fraud_count': ('is_fraud', 'sum')
+        }
+        if 'risk_score' in transactions_df.columns:
+            aggregations['avg_risk_score'] = ('risk_score', 'mean')
+        
+        # Summing a boolean column keeps the fraud count on the cython path
+        columns = [col, *(source for source, _ in aggregations.values())]
+        frame = transactions_df[columns].assign(is_fraud=transactions_df['is_fraud'] == True)
+        group_stats = frame.groupby(col, observed=True).agg(**aggregations).reset_index()
+        group_stats['fraud_rate'] = group_stats['fraud_count'] / group_stats['transaction_count']
+        
+        return group_stats
+    
+    def _daily_stats(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
+        """Per-day count, amount and risk aggregates shared by the trend charts"""
+        return self._memoized(transactions_df, 'daily', self._build_daily_stats)
+    
+    def _build_daily_stats(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
+        """Compute the aggregates behind _daily_stats"""
+        aggregations = {
+            'transaction_count': ('transaction_id', 'count'),
+            'total_amount': ('amount', 'sum'),
+            'avg_amount': ('amount', 'mean')
+        }
+        if 'risk_score' in transactions_df.columns:
+            aggregations['avg_risk_score'] = ('risk_score', 'mean')
+        
+        daily_stats = transactions_df.groupby(
+            self._time_keys(transactions_df)['date_ord']
+        ).agg(**aggregations).reset_index(names='date')
+        daily_stats['date'] = self._ord_dates(daily_stats['date'])
+        
+        return daily_stats
+    
+    def _time_keys(self, transactions_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Hour, day-ordinal and weekday arrays for a frame, derived once and memoized"""
+        return self._memoized(transactions_df, 'time', self._build_time_keys)
+    
+    def _build_time_keys(self, transactions_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Compute the arrays behind _time_keys"""
+        # Processed frames already carry _hour and _date_ord; only fall back to the timestamps when missing
+        timestamps = pd.DatetimeIndex(transactions_df['timestamp'])
+        if '_hour' in transactions_df.columns:
+            hour = transactions_df['_hour'].to_numpy(dtype=np.intp)
+        else:
+            hour = timestamps.hour.to_numpy(dtype=np.intp)
+        if '_date_ord' in transactions_df.columns:
+            date_ord = transactions_df['_date_ord'].to_numpy()
+        else:
+            date_ord = timestamps.to_numpy().astype('datetime64[D]').view('int64')
+        return {'hour': hour, 'date_ord': date_ord, 'dow': timestamps.dayofweek.to_numpy(dtype=np.intp)}
+    
+    @staticmethod
+    def _ord_dates(date_ord: pd.Series) -> np.ndarray:
+        """Convert grouped day ordinals back to datetime.date labels"""
+        return pd.to_datetime(date_ord.to_numpy(), unit='D').date
+    
+    @staticmethod
+    def _binned(values: np.ndarray, edges: np.ndarray) -> Dict[str, np.ndarray]:
+        """Bar x/y/width for a histogram, binned here so only the bins are serialized"""
+        counts, _ = np.histogram(values[np.isfinite(values)], bins=edges)
+        return {
+            'x': ((edges[:-1] + edges[1:]) / 2).astype(np.float32),
+            'y': counts.astype(np.int32),
+            'width': np.diff(edges).astype(np.float32)
+        }
     
     def create_risk_distribution(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create risk score distribution chart"""
         fig = go.Figure()
         
-        # Risk score histogram
-        fig.add_trace(go.Histogram(
-            x=transactions_df['risk_score'],
-            nbinsx=20,
+        # Risk score histogram (scores are capped to [0, 1])
+        fig.add_trace(go.Bar(
+            **self._binned(transactions_df['risk_score'].to_numpy(dtype=float), np.linspace(0.0, 1.0, 21)),
             name='Risk Score Distribution',
             marker_color=self.color_scheme['primary'],
             opacity=0.7
@@ -56,15 +153,7 @@ class Visualizations:
     def create_time_series(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create time series chart of transactions"""
         # Group by day
-        daily_transactions = transactions_df.groupby(
-            transactions_df['timestamp'].dt.date
-        ).agg({
-            'transaction_id': 'count',
-            'amount': 'sum',
-            'risk_score': 'mean'
-        }).reset_index()
-        
-        daily_transactions.columns = ['date', 'transaction_count', 'total_amount', 'avg_risk_score']
+        daily_transactions = self._daily_stats(transactions_df)
         
         # Create subplots
         fig = make_subplots(
@@ -107,15 +196,7 @@ class Visualizations:
     
     def create_location_analysis(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create location-based fraud analysis"""
-        location_stats = transactions_df.groupby('location').agg({
-            'transaction_id': 'count',
-            'amount': 'sum',
-            'risk_score': 'mean',
-            'is_fraud': lambda x: (x == True).sum()
-        }).reset_index()
-        
-        location_stats.columns = ['location', 'transaction_count', 'total_amount', 'avg_risk_score', 'fraud_count']
-        location_stats['fraud_rate'] = location_stats['fraud_count'] / location_stats['transaction_count']
+        location_stats = self._group_stats(transactions_df, 'location')
         location_stats = location_stats.sort_values('fraud_rate', ascending=False).head(10)
         
         fig = go.Figure(data=go.Bar(
@@ -142,25 +223,27 @@ class Visualizations:
         """Create amount distribution chart"""
         fig = go.Figure()
         
-        # Normal transactions
-        normal_transactions = transactions_df[transactions_df['is_fraud'] == False]
-        fraud_transactions = transactions_df[transactions_df['is_fraud'] == True]
+        # Mask the amount array rather than slicing the frame per class
+        amounts = transactions_df['amount'].to_numpy(dtype=float)
+        normal = (transactions_df['is_fraud'] == False).to_numpy()
+        fraud = (transactions_df['is_fraud'] == True).to_numpy()
         
-        fig.add_trace(go.Histogram(
-            x=normal_transactions['amount'],
+        # Both overlays share one set of 30 bins over the whole amount range
+        edges = np.histogram_bin_edges(amounts[np.isfinite(amounts)], bins=30)
+        
+        fig.add_trace(go.Bar(
+            **self._binned(amounts[normal], edges),
             name='Normal Transactions',
             opacity=0.7,
-            marker_color=self.color_scheme['success'],
-            nbinsx=30
+            marker_color=self.color_scheme['success']
         ))
         
-        if not fraud_transactions.empty:
-            fig.add_trace(go.Histogram(
-                x=fraud_transactions['amount'],
+        if fraud.any():
+            fig.add_trace(go.Bar(
+                **self._binned(amounts[fraud], edges),
                 name='Fraudulent Transactions',
                 opacity=0.7,
-                marker_color=self.color_scheme['danger'],
-                nbinsx=30
+                marker_color=self.color_scheme['danger']
             ))
         
         fig.update_layout(
@@ -175,14 +258,7 @@ class Visualizations:
     
     def create_merchant_analysis(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create merchant category analysis"""
-        merchant_stats = transactions_df.groupby('merchant_category').agg({
-            'transaction_id': 'count',
-            'amount': 'sum',
-            'is_fraud': lambda x: (x == True).sum()
-        }).reset_index()
-        
-        merchant_stats.columns = ['merchant_category', 'transaction_count', 'total_amount', 'fraud_count']
-        merchant_stats['fraud_rate'] = merchant_stats['fraud_count'] / merchant_stats['transaction_count']
+        merchant_stats = self._group_stats(transactions_df, 'merchant_category')
         merchant_stats = merchant_stats.sort_values('transaction_count', ascending=True).tail(10)
         
         fig = go.Figure(data=go.Bar(
@@ -208,14 +284,28 @@ class Visualizations:
     
     def create_hourly_patterns(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create hourly transaction patterns"""
-        hourly_stats = transactions_df.groupby(transactions_df['timestamp'].dt.hour).agg({
-            'transaction_id': 'count',
-            'amount': 'sum',
-            'risk_score': 'mean',
-            'is_fraud': lambda x: (x == True).sum()
-        }).reset_index()
-        
-        hourly_stats.columns = ['hour', 'transaction_count', 'total_amount', 'avg_risk_score', 'fraud_count']
+        hours = self._time_keys(transactions_df)['hour']
+        
+        # One bincount pass per aggregate over the 24 hour slots
+        amounts = transactions_df['amount'].to_numpy(dtype=float)
+        risk = transactions_df['risk_score'].to_numpy(dtype=float)
+        risk_known = ~np.isnan(risk)
+        counts = np.bincount(hours[transactions_df['transaction_id'].notna().to_numpy()], minlength=24)
+        total_amount = np.bincount(hours, weights=np.nan_to_num(amounts), minlength=24)
+        risk_sum = np.bincount(hours[risk_known], weights=risk[risk_known], minlength=24)
+        risk_count = np.bincount(hours[risk_known], minlength=24)
+        fraud_count = np.bincount(hours, weights=(transactions_df['is_fraud'] == True).to_numpy(), minlength=24)
+        
+        observed = np.flatnonzero(np.bincount(hours, minlength=24))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_risk = risk_sum / risk_count
+        hourly_stats = pd.DataFrame({
+            'hour': observed,
+            'transaction_count': counts[observed],
+            'total_amount': total_amount[observed],
+            'avg_risk_score': avg_risk[observed],
+            'fraud_count': fraud_count[observed].astype(np.int64)
+        })
         hourly_stats['fraud_rate'] = hourly_stats['fraud_count'] / hourly_stats['transaction_count']
         
         # Create subplots
@@ -263,11 +353,7 @@ class Visualizations:
     
     def create_volume_trend(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create transaction volume trend"""
-        daily_volume = transactions_df.groupby(
-            transactions_df['timestamp'].dt.date
-        )['transaction_id'].count().reset_index()
-        
-        daily_volume.columns = ['date', 'transaction_count']
+        daily_volume = self._daily_stats(transactions_df)
         
         fig = go.Figure(data=go.Scatter(
             x=daily_volume['date'],
@@ -288,11 +374,7 @@ class Visualizations:
     
     def create_amount_trend(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create average amount trend"""
-        daily_amount = transactions_df.groupby(
-            transactions_df['timestamp'].dt.date
-        )['amount'].mean().reset_index()
-        
-        daily_amount.columns = ['date', 'avg_amount']
+        daily_amount = self._daily_stats(transactions_df)
         
         fig = go.Figure(data=go.Scatter(
             x=daily_amount['date'],
@@ -313,14 +395,7 @@ class Visualizations:
     
     def create_geographic_analysis(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create geographic distribution analysis"""
-        location_stats = transactions_df.groupby('location').agg({
-            'transaction_id': 'count',
-            'amount': 'sum',
-            'is_fraud': lambda x: (x == True).sum()
-        }).reset_index()
-        
-        location_stats.columns = ['location', 'transaction_count', 'total_amount', 'fraud_count']
-        location_stats['fraud_rate'] = location_stats['fraud_count'] / location_stats['transaction_count']
+        location_stats = self._group_stats(transactions_df, 'location')
         location_stats = location_stats.sort_values('transaction_count', ascending=False).head(15)
         
         fig = go.Figure(data=go.Scatter(
@@ -354,23 +429,24 @@ class Visualizations:
     
     def create_risk_score_heatmap(self, transactions_df: pd.DataFrame) -> go.Figure:
         """Create risk score heatmap by hour and day of week"""
-        # Create hour and day of week columns
-        df_temp = transactions_df.copy()
-        df_temp['hour'] = df_temp['timestamp'].dt.hour
-        df_temp['day_of_week'] = df_temp['timestamp'].dt.day_name()
-        
-        # Calculate average risk score for each hour-day combination
-        heatmap_data = df_temp.groupby(['day_of_week', 'hour'])['risk_score'].mean().reset_index()
-        heatmap_pivot = heatmap_data.pivot(index='day_of_week', columns='hour', values='risk_score')
-        
-        # Reorder days
+        # Accumulate a 7x24 day/hour grid straight from the cached keys
+        keys = self._time_keys(transactions_df)
+        cells = keys['dow'] * 24 + keys['hour']
+        risk = transactions_df['risk_score'].to_numpy(dtype=float)
+        known = ~np.isnan(risk)
+        risk_sum = np.bincount(cells[known], weights=risk[known], minlength=7 * 24).reshape(7, 24)
+        risk_count = np.bincount(cells[known], minlength=7 * 24).reshape(7, 24)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            heatmap = risk_sum / risk_count
+        
+        # Only hours that occur in the data get a column
+        hours = np.flatnonzero(np.bincount(keys['hour'], minlength=24))
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        heatmap_pivot = heatmap_pivot.reindex(day_order)
         
         fig = go.Figure(data=go.Heatmap(
-            z=heatmap_pivot.values,
-            x=heatmap_pivot.columns,
-            y=heatmap_pivot.index,
+            z=heatmap[:, hours],
+            x=hours,
+            y=day_order,
             colorscale='Reds',
             hoverongaps=False
         ))